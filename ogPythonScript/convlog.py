@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded conversation log.
+
+Keeps the newest lines in a fixed ring of compact records (UTF-8 bytes)
+and spills older ones, a batch at a time, to an append-only file.
+Iterating gives every line in order - spilled first, then the ring - so
+the final results dump works as it did with a plain list, while memory
+stays the same however long the session runs.
+
+Each log spills to its own file (never shared with another session).
+With durable=True, checkpoint() writes everything to that file, so a
+crashed session's conversation can still be read back from disk.
+
+Spill file format: per record, 4-byte little-endian length + UTF-8 bytes.
+"""
+import os
+import struct
+import tempfile
+
+_LEN = struct.Struct("<I")
+
+class ConversationLog:
+    """
+    capacity  - lines kept in memory
+    batch     - lines written per spill (when the ring is full)
+    spill_dir - where this log's own spill file is created (system temp
+                dir if None). Only created on the first spill; its name
+                is in spill_path after that.
+    durable   - checkpoint() spills everything (else it does nothing)
+    """
+    def __init__(self, capacity=64, batch=16, spill_dir=None, durable=False):
+        if capacity < 1 or not (1 <= batch <= capacity):
+            raise ValueError("need capacity >= 1 and 1 <= batch <= capacity")
+        self.capacity = capacity
+        self.batch = batch
+        self.spill_dir = spill_dir
+        self.durable = durable
+        self.spill_path = None
+        self._ring = [None] * capacity
+        self._head = 0        # slot of the oldest in-memory line
+        self._count = 0       # lines in memory
+        self._spilled = 0     # lines on disk
+        self._file = None
+        self._removed = False
+
+    def __len__(self):
+        return self._spilled + self._count
+
+    def append(self, line):
+        if self._count == self.capacity:
+            self._spill(self.batch)
+        self._ring[(self._head + self._count) % self.capacity] = line.encode("utf-8")
+        self._count += 1
+
+    def _spill(self, n):
+        """Move the n oldest in-memory lines to the spill file in one write."""
+        if n <= 0:
+            return
+        if self._file is None:
+            if self.spill_path is not None:
+                raise ValueError("ConversationLog is closed")
+            fd, self.spill_path = tempfile.mkstemp(prefix="ntr_convlog_", suffix=".log",
+                                                   dir=self.spill_dir)
+            self._file = os.fdopen(fd, "ab")
+        chunks = []
+        for _ in range(n):
+            rec = self._ring[self._head]
+            chunks.append(_LEN.pack(len(rec)))
+            chunks.append(rec)
+            self._ring[self._head] = None
+            self._head = (self._head + 1) % self.capacity
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+        self._count -= n
+        self._spilled += n
+
+    def flush(self):
+        """Spill everything still in memory (e.g. before a risky step)."""
+        self._spill(self._count)
+
+    def checkpoint(self):
+        """Interaction boundary: flush() if durable."""
+        if self.durable:
+            self.flush()
+
+    def _read_spilled(self):
+        if not self._spilled:
+            return
+        if self._removed:
+            raise ValueError("spill file was removed by close(remove=True)")
+        with open(self.spill_path, "rb") as f:
+            for _ in range(self._spilled):
+                (size,) = _LEN.unpack(f.read(_LEN.size))
+                yield f.read(size).decode("utf-8")
+
+    def __iter__(self):
+        yield from self._read_spilled()
+        for i in range(self._count):
+            yield self._ring[(self._head + i) % self.capacity].decode("utf-8")
+
+    def close(self, remove=False):
+        """
+        Close the spill file; remove=True deletes it once it's been dumped.
+        Lines still in memory stay readable; spilled ones too unless removed.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if remove and self.spill_path is not None and not self._removed:
+            os.remove(self.spill_path)
+            self._removed = True
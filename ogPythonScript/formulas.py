@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Designer-defined synergy formulas.
+
+A formula is a small arithmetic expression over stat abbreviations, e.g.
+
+    2 + PRS/64*1.5 + THI/64*1.2 - IAW/64*2 * (1 - SPT/128)
+    BASE * 1.1
+    max(0, (RSN + PJT)/64 - ELG/64) if THI > 40 else BASE
+
+Allowed: numbers, the 22 stat abbreviations (PRS, ADP, ..., SCM, ..., EAC, ...),
+BASE (the option's built-in formula, see gameNTR.synergy_tags_formula),
++ - * /, ** with a small whole-number exponent (not stacked: no
+(x**2)**3), one comparison per 'a if cond else b', and min(), max(),
+abs(), clamp(x, lo, hi). Constants are at most 1e6 in size.
+Anything else (names, attributes, strings, indexing, lambdas...) is
+rejected with FormulaError when the file is loaded.
+
+Each formula is validated once and compiled to a plain Python function
+(scalar, for interactive play) and a numpy version (whole columns at
+once, for bulk work). Both evaluate in floats and agree row for row:
+a row counts as 0 when it divides by zero, overflows in **, compares
+a non-finite value or ends up non-finite; otherwise the result is
+capped to the engine's per-line range [0, 10].
+
+File format (JSON), keyed by scene then "<interaction>.<option>":
+
+    {"shower_talk": {"default": "BASE", "1.1": "BASE * 1.1"}}
+
+"default" applies to every option of the scene that has no own entry.
+"""
+import ast
+import copy
+import functools
+import json
+import math
+import operator
+
+from resultstore import MC_ABBRS, RIVAL_ABBRS, TARGET_ABBRS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STAT_NAMES = frozenset(MC_ABBRS + RIVAL_ABBRS + TARGET_ABBRS)
+LINE_MIN, LINE_MAX = 0.0, 10.0
+MAX_SOURCE_LEN = 400
+MAX_POW = 4
+MAX_CONST = 1e6
+
+class FormulaError(ValueError):
+    pass
+
+##########################################################
+# 0) Validation
+##########################################################
+
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow)
+_UNARY_OPS = (ast.UAdd, ast.USub)
+_CMP_OPS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+_FUNCS = {"min": (2, None), "max": (2, None), "abs": (1, 1), "clamp": (3, 3)}
+
+def _check(node, key):
+    """Raise FormulaError on anything outside the whitelist."""
+    def bad(msg):
+        raise FormulaError(f"{key}: {msg}")
+
+    if isinstance(node, ast.Expression):
+        return _check(node.body, key)
+    if isinstance(node, ast.Constant):
+        if type(node.value) not in (int, float):
+            bad(f"only numbers allowed, got {node.value!r}")
+        if abs(node.value) > MAX_CONST:
+            bad(f"constants must be at most {MAX_CONST:.0f} in size")
+        return
+    if isinstance(node, ast.Name):
+        if node.id not in STAT_NAMES and node.id != "BASE":
+            bad(f"unknown name '{node.id}'")
+        return
+    if isinstance(node, ast.BinOp):
+        if not isinstance(node.op, _BIN_OPS):
+            bad(f"operator {type(node.op).__name__} not allowed")
+        if isinstance(node.op, ast.Pow):
+            exp = node.right
+            if isinstance(exp, ast.UnaryOp) and isinstance(exp.op, ast.USub):
+                exp = exp.operand
+            if not (isinstance(exp, ast.Constant) and type(exp.value) is int
+                    and abs(exp.value) <= MAX_POW):
+                bad(f"** needs a whole-number constant exponent of at most {MAX_POW}")
+            if any(isinstance(n, ast.BinOp) and isinstance(n.op, ast.Pow)
+                   for n in ast.walk(node.left)):
+                bad("** can't be applied to something that already uses **")
+        _check(node.left, key)
+        _check(node.right, key)
+        return
+    if isinstance(node, ast.UnaryOp):
+        if not isinstance(node.op, _UNARY_OPS):
+            bad(f"operator {type(node.op).__name__} not allowed")
+        return _check(node.operand, key)
+    if isinstance(node, ast.Compare):
+        if len(node.ops) != 1 or not isinstance(node.ops[0], _CMP_OPS):
+            bad("comparisons must be a single <, <=, > or >=")
+        _check(node.left, key)
+        _check(node.comparators[0], key)
+        return
+    if isinstance(node, ast.IfExp):
+        if not isinstance(node.test, ast.Compare):
+            bad("'if' needs a comparison as its condition")
+        for part in (node.test, node.body, node.orelse):
+            _check(part, key)
+        return
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCS:
+            bad("only min(), max(), abs() and clamp() can be called")
+        lo, hi = _FUNCS[node.func.id]
+        if node.keywords or any(isinstance(a, ast.Starred) for a in node.args):
+            bad(f"{node.func.id}() takes plain arguments only")
+        if len(node.args) < lo or (hi is not None and len(node.args) > hi):
+            bad(f"wrong number of arguments to {node.func.id}()")
+        for a in node.args:
+            _check(a, key)
+        return
+    bad(f"{type(node).__name__} not allowed")
+
+def parse(source, key="formula"):
+    """Validated expression AST for 'source'."""
+    if not isinstance(source, str):
+        raise FormulaError(f"{key}: formula must be a string")
+    if len(source) > MAX_SOURCE_LEN:
+        raise FormulaError(f"{key}: formula longer than {MAX_SOURCE_LEN} characters")
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise FormulaError(f"{key}: syntax error: {e.msg}") from None
+    _check(tree, key)
+    return tree
+
+##########################################################
+# A) Compilation
+##########################################################
+
+_CMP_FUNCS = {ast.Lt: "_lt", ast.LtE: "_le", ast.Gt: "_gt", ast.GtE: "_ge"}
+
+class _Lower(ast.NodeTransformer):
+    """
+    Inlines BASE, makes every number a float (no huge ints) and turns
+    comparisons into _lt(a, b) etc., which fail on non-finite operands.
+    For the numpy version also turns 'a if c else b' into _where(c, a, b),
+    x / y into _div(x, y) and x ** n into _pow(x, n). Where the scalar
+    version raises, these give NaN instead, so the row ends up 0 in both.
+    """
+    def __init__(self, base, vector):
+        self.base = base
+        self.vector = vector
+
+    def visit_Name(self, node):
+        if node.id == "BASE":
+            if self.base is None:
+                raise FormulaError("BASE used where the option has no built-in formula")
+            return self.visit(copy.deepcopy(self.base))
+        return node
+
+    def visit_Constant(self, node):
+        return ast.Constant(float(node.value))
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        return _call(_CMP_FUNCS[type(node.ops[0])], node.left, node.comparators[0])
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        if not self.vector:
+            return node
+        return _call("_where", node.test, node.body, node.orelse)
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if self.vector and isinstance(node.op, ast.Div):
+            return _call("_div", node.left, node.right)
+        if self.vector and isinstance(node.op, ast.Pow):
+            return _call("_pow", node.left, node.right)
+        return node
+
+def _call(name, *args):
+    return ast.Call(func=ast.Name(name, ast.Load()), args=list(args), keywords=[])
+
+# min/max/clamp let NaN through like numpy's minimum/maximum do
+def _scalar_min(*a):
+    return math.nan if any(x != x for x in a) else min(a)
+
+def _scalar_max(*a):
+    return math.nan if any(x != x for x in a) else max(a)
+
+def _scalar_clamp(x, lo, hi):
+    return _scalar_max(lo, _scalar_min(x, hi))
+
+def _scalar_cmp(op):
+    def cmp(a, b):
+        if not (math.isfinite(a) and math.isfinite(b)):
+            raise FloatingPointError("comparison with a non-finite value")
+        return op(a, b)
+    return cmp
+
+def _line(val):
+    """Raw formula value -> synergy line; non-finite counts as 0 like numpy's nan_to_num."""
+    if not math.isfinite(val):
+        return 0.0
+    return max(LINE_MIN, min(val, LINE_MAX))
+
+_SCALAR_ENV = {
+    "__builtins__": {},
+    "min": _scalar_min, "max": _scalar_max, "abs": abs, "clamp": _scalar_clamp,
+    "_lt": _scalar_cmp(operator.lt), "_le": _scalar_cmp(operator.le),
+    "_gt": _scalar_cmp(operator.gt), "_ge": _scalar_cmp(operator.ge),
+}
+
+if np is not None:
+    def _vector_div(a, b):
+        b = np.asarray(b, dtype=np.float64)
+        zero = b == 0
+        return np.where(zero, np.nan, a / np.where(zero, 1.0, b))
+
+    def _vector_pow(a, n):
+        # inf from a finite base is 0 ** -n or an overflow: both raise in Python
+        a = np.asarray(a, dtype=np.float64)
+        out = a ** n
+        return np.where(np.isinf(out) & np.isfinite(a), np.nan, out)
+
+    def _vector_cmp(op):
+        def cmp(a, b):
+            ok = np.isfinite(a) & np.isfinite(b)
+            return np.where(ok, op(a, b), np.nan)
+        return cmp
+
+    def _vector_where(test, a, b):
+        # test comes from _lt & co.: 1.0 / 0.0, NaN if it couldn't compare
+        return np.where(np.isnan(test), np.nan, np.where(test != 0, a, b))
+
+    _VECTOR_ENV = {
+        "__builtins__": {},
+        "min": lambda *a: functools.reduce(np.minimum, a),
+        "max": lambda *a: functools.reduce(np.maximum, a),
+        "abs": np.abs,
+        "clamp": lambda x, lo, hi: np.maximum(lo, np.minimum(x, hi)),
+        "_lt": _vector_cmp(operator.lt), "_le": _vector_cmp(operator.le),
+        "_gt": _vector_cmp(operator.gt), "_ge": _vector_cmp(operator.ge),
+        "_where": _vector_where, "_div": _vector_div, "_pow": _vector_pow,
+    }
+else:
+    _VECTOR_ENV = None
+
+class Formula:
+    """
+    A compiled formula. f(stats) takes {abbr: value} and returns the
+    capped synergy line; f.columns({abbr: array}) does whole columns.
+    """
+    def __init__(self, source, key="formula", base=None):
+        self.source = source
+        self.key = key
+        self.base = base   # BASE's source, which 'source' may expand
+        tree = parse(source, key)
+        base_tree = parse(base, f"{key} BASE").body if base is not None else None
+        body = _Lower(base_tree, vector=False).visit(copy.deepcopy(tree)).body
+        self.names = sorted({n.id for n in ast.walk(body) if isinstance(n, ast.Name)} & STAT_NAMES)
+        self._scalar = self._compile(body, _SCALAR_ENV)
+        self._vector = None
+        if np is not None:
+            vbody = _Lower(base_tree, vector=True).visit(tree).body
+            self._vector = self._compile(vbody, _VECTOR_ENV)
+
+    def _compile(self, body, env):
+        """lambda <used stats>: body, evaluated with only 'env' visible."""
+        lam = ast.Expression(ast.Lambda(
+            args=ast.arguments(posonlyargs=[], args=[ast.arg(n) for n in self.names],
+                               kwonlyargs=[], kw_defaults=[], defaults=[]),
+            body=body))
+        code = compile(ast.fix_missing_locations(lam), f"<formula {self.key}>", "eval")
+        return eval(code, dict(env))
+
+    def __call__(self, stats):
+        try:
+            val = float(self._scalar(*[float(stats[n]) for n in self.names]))
+        except ArithmeticError:   # ZeroDivisionError, OverflowError, FloatingPointError
+            val = 0.0
+        return _line(val)
+
+    def columns(self, cols):
+        """Vectorised over columns (numpy arrays, or any sequences without numpy)."""
+        if self._vector is None:
+            if not self.names:
+                return [self({})] * len(next(iter(cols.values())))
+            out = []
+            for row in zip(*[cols[n] for n in self.names]):
+                try:
+                    val = float(self._scalar(*[float(v) for v in row]))
+                except ArithmeticError:
+                    val = 0.0
+                out.append(_line(val))
+            return out
+        args = [np.asarray(cols[n], dtype=np.float64) for n in self.names]
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            if args:
+                out = self._vector(*args)
+            else:   # constant formula: one value per row
+                out = np.full(len(next(iter(cols.values()))), self({}), dtype=np.float64)
+        out = np.nan_to_num(np.asarray(out, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+        return np.clip(out, LINE_MIN, LINE_MAX)
+
+##########################################################
+# B) Loading a formula file
+##########################################################
+
+def load_formulas(path, scene, interactions, base_for_tags):
+    """
+    Compiles every formula that applies to 'scene'.
+    'interactions' is the scene's list (as in gameNTR.SHOWER_TALK) and
+    base_for_tags(tags) gives the built-in formula source of an option.
+    Returns {(interaction index, option number): Formula}; options with
+    no formula are absent and keep the built-in breakdown.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+    except OSError as e:
+        raise FormulaError(f"{path}: can't read formula file: {e.strerror}") from None
+    except json.JSONDecodeError as e:
+        raise FormulaError(f"{path}: bad JSON: {e}") from None
+    if not isinstance(spec, dict):
+        raise FormulaError(f"{path}: top level must be an object of scenes")
+    scene_spec = spec.get(scene, {})
+    if not isinstance(scene_spec, dict):
+        raise FormulaError(f"{path}: scene '{scene}' must be an object")
+
+    valid = {"default"} | {f"{i + 1}.{k}" for i, inter in enumerate(interactions)
+                           for k in inter["options"]}
+    for key in scene_spec:
+        if key not in valid:
+            raise FormulaError(f"{scene}.{key}: no such option (use 'default' or e.g. '1.2')")
+
+    compiled = {}
+    for i, inter in enumerate(interactions):
+        for k, optdata in inter["options"].items():
+            key = f"{i + 1}.{k}"
+            source = scene_spec.get(key, scene_spec.get("default"))
+            if source is None:
+                continue
+            compiled[(i, int(k))] = Formula(source, f"{scene}.{key}",
+                                            base=base_for_tags(optdata["synergy"]))
+    return compiled
@@ -8,6 +8,12 @@ import math
 import platform
 import select
 
+import memprofile
+from convlog import ConversationLog
+import resultstore
+import formulas
+import picksets
+
 # Try to import termios and tty (Linux/Mac). If on Windows, will fail gracefully.
 if platform.system() != "Windows":
     import termios
@@ -58,35 +64,53 @@ def clamp(value, low, high):
     """Keeps 'value' in [low, high]."""
     return max(low, min(value, high))
 
-def update_timer(total_time, start_time, penalty, stop_event):
+class TerminalIO:
+    """
+    Default session I/O: the player's real terminal.
+    Anything with write(text), read_char(timeout) and a 'lines'
+    attribute can stand in for it (see loadtest.py).
+    """
+    @property
+    def lines(self):
+        try:
+            return os.get_terminal_size().lines
+        except:
+            return 24
+
+    def write(self, text):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def read_char(self, timeout=0.05):
+        return get_char_nonblocking(timeout)
+
+TERMINAL_IO = TerminalIO()
+
+def update_timer(total_time, start_time, penalty, stop_event, io=TERMINAL_IO):
     """
     Displays a timer at bottom line, factoring in penalty.
     If time runs out, sets stop_event so synergy ends.
     """
-    try:
-        lines = os.get_terminal_size().lines
-    except:
-        lines = 24
+    lines = io.lines
     while not stop_event.is_set():
         elapsed = (time.time() - start_time) + penalty[0]
         remain = total_time - elapsed
         if remain < 0:
             remain = 0
-        sys.stdout.write(f"\033[{lines};1HTime remaining: {int(remain)}s   ")
-        sys.stdout.flush()
+        io.write(f"\033[{lines};1HTime remaining: {int(remain)}s   ")
         if remain <= 0:
             stop_event.set()
             break
-        time.sleep(1)
+        # wait() instead of sleep() so join() returns as soon as synergy ends
+        stop_event.wait(1)
 
-def get_input_nonblocking(prompt, total_time, start_time, penalty):
+def get_input_nonblocking(prompt, total_time, start_time, penalty, io=TERMINAL_IO):
     """
     Cross-platform non-blocking input with a time check. 
     If time runs out, returns None.
     'penalty' is a list with one float for time penalties.
     """
-    sys.stdout.write(prompt)
-    sys.stdout.flush()
+    io.write(prompt)
     user_str = ""
 
     while True:
@@ -95,25 +119,22 @@ def get_input_nonblocking(prompt, total_time, start_time, penalty):
             return None
 
         # Read one char if available
-        ch = get_char_nonblocking(0.05)
+        ch = io.read_char(0.05)
         if ch is not None:
             # Windows getwch() returns '\r' for Enter, 
             # Linux typically returns '\n'. Also handle backspace, etc.
             if ch in ("\r", "\n"):
-                sys.stdout.write("\n")
-                sys.stdout.flush()
+                io.write("\n")
                 break
             # Handle backspace on Windows ('\b') or Linux ('\x7f' often for DEL)
             elif ch in ("\b", "\x7f"):
                 if user_str:
                     user_str = user_str[:-1]
                     # Erase on screen
-                    sys.stdout.write("\b \b")
-                    sys.stdout.flush()
+                    io.write("\b \b")
             else:
                 user_str += ch
-                sys.stdout.write(ch)
-                sys.stdout.flush()
+                io.write(ch)
 
         time.sleep(0.01)
 
@@ -247,17 +268,40 @@ def guess_stat_name(user_input):
 # D) Choose Stats
 ##########################################################
 
-def choose_stats():
-    stats_list = [
-        "Presence (PRS)",
-        "Adaptability (ADP)",
-        "Instinct (INS)",
-        "Will (WIL)",
-        "Projection (PJT)",
-        "Conviction (CVT)",
-        "Resonance (RSN)",
-        "Spirit (SPT)"
-    ]
+MC_STAT_NAMES = [
+    "Presence (PRS)",
+    "Adaptability (ADP)",
+    "Instinct (INS)",
+    "Will (WIL)",
+    "Projection (PJT)",
+    "Conviction (CVT)",
+    "Resonance (RSN)",
+    "Spirit (SPT)"
+]
+
+def roll_mc_stats(chosen_stats):
+    """Rolls every MC stat; chosen ones get the higher bell curve."""
+    final_stats = {}
+    for s in MC_STAT_NAMES:
+        if s in chosen_stats:
+            v = roll_stat_bell_chosen(mu=40, sigma=10)  # ~[20..64]
+        else:
+            v = roll_stat_bell(mu=32, sigma=10)         # ~[1..64]
+        final_stats[s] = v
+    return final_stats
+
+def describe_pick_set(chosen_stats, pickset_table):
+    """One line on how strong a pick set is, from the prebuilt table."""
+    if pickset_table is None:
+        return None
+    r = pickset_table[resultstore.picks_mask(chosen_stats)]
+    if r is None:
+        return None
+    return (f"Pick-set strength: expected synergy {r['ev_random']:.1f} "
+            f"(best play {r['ev_best']:.1f}), unlock chance {r['p_unlock']:.0%}")
+
+def choose_stats(pickset_table=None):
+    stats_list = MC_STAT_NAMES
 
     while True:
         chosen_stats = []
@@ -305,6 +349,9 @@ def choose_stats():
         print("\nYou picked:")
         for cst in chosen_stats:
             print(" -", cst)
+        strength = describe_pick_set(chosen_stats, pickset_table)
+        if strength:
+            print(strength)
         confirm = input("\nAre you sure? (Y/N): ").strip().lower()
         if confirm == 'y':
             break
@@ -312,13 +359,7 @@ def choose_stats():
             print("Resetting picks. Press Enter to pick again.")
             input()
 
-    final_stats = {}
-    for s in stats_list:
-        if s in chosen_stats:
-            v = roll_stat_bell_chosen(mu=40, sigma=10)  # ~[20..64]
-        else:
-            v = roll_stat_bell(mu=32, sigma=10)         # ~[1..64]
-        final_stats[s] = v
+    final_stats = roll_mc_stats(chosen_stats)
 
     print("\n=== Final MC Stats (1..64) ===")
     print("(Chosen => ~[20..64], unchosen => [1..64], both bell-curve).")
@@ -326,7 +367,7 @@ def choose_stats():
         print(f" {s}: {final_stats[s]}")
     input("\nPress Enter to proceed...")
 
-    return final_stats
+    return final_stats, chosen_stats
 
 ##########################################################
 # E) Rival (Victim) & Target Stats
@@ -378,7 +419,113 @@ def sibling_label(age_status):
 # G) Synergy with Detailed Breakdown
 ##########################################################
 
-def synergy_convo(mc_stats, target_stats, victim_stats):
+# The conversation while the friend showers; built once, shared by every session.
+SHOWER_TALK_SCENE = "shower_talk"
+SHOWER_TALK = [
+    {
+        "prompt": "[Target sees your outburst...]",
+        "options":{
+            "1":{
+              "text":"What? You don’t get hyped when you win?",
+              "synergy":{
+                 "MC_needed":["Presence","Conviction"],
+                 "Target_needed":["ThrillIncl"],
+                 "Victim_risk":["IAW"]
+              }
+            },
+            "2":{
+              "text":"I thought I was alone saying that.",
+              "synergy":{
+                "MC_needed":["Adaptability"],
+                "Target_needed":["Autonomy"],
+                "Victim_risk":[]
+              }
+            },
+            "3":{
+              "text":"Should I apologize?",
+              "synergy":{
+                "MC_needed":["Will"],
+                "Target_needed":["Anchoring"],
+                "Victim_risk":["SCM"]
+              }
+            }
+        }
+    },
+    {
+        "prompt":"(They draw closer) 'So, do you always say whatever comes to mind?'",
+        "options":{
+            "1":{
+              "text":"If it’s worth saying, yeah.",
+              "synergy":{
+                "MC_needed":["Presence","Projection"],
+                "Target_needed":["ThrillIncl","RPM"],
+                "Victim_risk":["SCM","IAW"]
+              }
+            },
+            "2":{
+              "text":"Only when I’m feeling lucky.",
+              "synergy":{
+                "MC_needed":["Adaptability","Spirit"],
+                "Target_needed":["Autonomy"],
+                "Victim_risk":["RLP"]
+              }
+            },
+            "3":{
+              "text":"I usually think before I speak… usually.",
+              "synergy":{
+                "MC_needed":["Instinct"],
+                "Target_needed":["Masking"],
+                "Victim_risk":[]
+              }
+            }
+        }
+    },
+    {
+        "prompt":"(They glance away) 'So... you’re the bold type, or...?'",
+        "options":{
+            "1":{
+              "text":"You bet. I don’t hold back.",
+              "synergy":{
+                "MC_needed":["Presence","Will"],
+                "Target_needed":["ThrillIncl"],
+                "Victim_risk":["SCM","IAW","RLP"]
+              }
+            },
+            "2":{
+              "text":"I adapt to whoever I’m around.",
+              "synergy":{
+                "MC_needed":["Adaptability","Instinct"],
+                "Target_needed":["Masking","Autonomy"],
+                "Victim_risk":[]
+              }
+            },
+            "3":{
+              "text":"Is that too forward? I can slow down.",
+              "synergy":{
+                "MC_needed":["Conviction","Resonance"],
+                "Target_needed":["Anchoring","RPM"],
+                "Victim_risk":["ELG"]
+              }
+            }
+        }
+    }
+]
+
+# Outcome tiers for the conversation total (max 3*10)
+UNLOCK_AT = 25
+PARTIAL_AT = 15
+
+def synergy_outcome(synergy_score):
+    if synergy_score <= 0:
+        return "No conversation"
+    if synergy_score >= UNLOCK_AT:
+        return "NTR Option Unlocked!"
+    if synergy_score >= PARTIAL_AT:
+        return "Partially intrigued"
+    return "Unimpressed"
+
+def synergy_convo(mc_stats, target_stats, victim_stats, io=TERMINAL_IO, total_time=90, log=None,
+                  choices=None, synergy_formulas=None):
     """
     Hard synergy approach:
       baseline=2
@@ -386,14 +533,18 @@ def synergy_convo(mc_stats, target_stats, victim_stats):
       Rival penalty => ratio * 2.0
       Then multiply final synergy by (1 + luck_factor) from Spirit (SPT).
     We store a synergy breakdown for each line in the conversation log.
+    'io' is where prompts go and keys come from (terminal by default).
+    'log' is the ConversationLog to append to (a fresh one if None).
+    'choices', if a list, gets (interaction index, option, synergy) per answer.
+    'synergy_formulas' ({(index, option): Formula}) replaces the built-in
+    breakdown for the options it covers.
     """
-    total_time = 90
     start_time = time.time()
     penalty = [0]
     stop_event = threading.Event()
 
     synergy_score = 0.0
-    conversation_log = []
+    conversation_log = log if log is not None else ConversationLog()
 
     # We'll compute a Spirit-based luck factor:
     # if SPT=32 => factor=0 => no effect
@@ -402,140 +553,85 @@ def synergy_convo(mc_stats, target_stats, victim_stats):
     SPT_val = mc_stats["Spirit (SPT)"]
     luck_factor = (SPT_val - 32) / 32 * 0.05  # ~ -0.05..+0.05
 
-    interactions = [
-        {
-            "prompt": "[Target sees your outburst...]",
-            "options":{
-                "1":{
-                  "text":"What? You don’t get hyped when you win?",
-                  "synergy":{
-                     "MC_needed":["Presence","Conviction"],
-                     "Target_needed":["ThrillIncl"],
-                     "Victim_risk":["IAW"]
-                  }
-                },
-                "2":{
-                  "text":"I thought I was alone saying that.",
-                  "synergy":{
-                    "MC_needed":["Adaptability"],
-                    "Target_needed":["Autonomy"],
-                    "Victim_risk":[]
-                  }
-                },
-                "3":{
-                  "text":"Should I apologize?",
-                  "synergy":{
-                    "MC_needed":["Will"],
-                    "Target_needed":["Anchoring"],
-                    "Victim_risk":["SCM"]
-                  }
-                }
-            }
-        },
-        {
-            "prompt":"(They draw closer) 'So, do you always say whatever comes to mind?'",
-            "options":{
-                "1":{
-                  "text":"If it’s worth saying, yeah.",
-                  "synergy":{
-                    "MC_needed":["Presence","Projection"],
-                    "Target_needed":["ThrillIncl","RPM"],
-                    "Victim_risk":["SCM","IAW"]
-                  }
-                },
-                "2":{
-                  "text":"Only when I’m feeling lucky.",
-                  "synergy":{
-                    "MC_needed":["Adaptability","Spirit"],
-                    "Target_needed":["Autonomy"],
-                    "Victim_risk":["RLP"]
-                  }
-                },
-                "3":{
-                  "text":"I usually think before I speak… usually.",
-                  "synergy":{
-                    "MC_needed":["Instinct"],
-                    "Target_needed":["Masking"],
-                    "Victim_risk":[]
-                  }
-                }
-            }
-        },
-        {
-            "prompt":"(They glance away) 'So... you’re the bold type, or...?'",
-            "options":{
-                "1":{
-                  "text":"You bet. I don’t hold back.",
-                  "synergy":{
-                    "MC_needed":["Presence","Will"],
-                    "Target_needed":["ThrillIncl"],
-                    "Victim_risk":["SCM","IAW","RLP"]
-                  }
-                },
-                "2":{
-                  "text":"I adapt to whoever I’m around.",
-                  "synergy":{
-                    "MC_needed":["Adaptability","Instinct"],
-                    "Target_needed":["Masking","Autonomy"],
-                    "Victim_risk":[]
-                  }
-                },
-                "3":{
-                  "text":"Is that too forward? I can slow down.",
-                  "synergy":{
-                    "MC_needed":["Conviction","Resonance"],
-                    "Target_needed":["Anchoring","RPM"],
-                    "Victim_risk":["ELG"]
-                  }
-                }
-            }
-        }
-    ]
+    interactions = SHOWER_TALK
 
-    tthread = threading.Thread(target=update_timer, args=(total_time, start_time, penalty, stop_event))
+    tthread = threading.Thread(target=update_timer, args=(total_time, start_time, penalty, stop_event, io))
     tthread.daemon = True
     tthread.start()
 
-    for inter in interactions:
+    for idx, inter in enumerate(interactions):
         conversation_log.append("\n" + inter["prompt"])
-        print("\n" + inter["prompt"])
+        io.write("\n" + inter["prompt"] + "\n")
         for k, optdata in inter["options"].items():
             line_str = f" {k}. {optdata['text']}"
-            print(line_str)
+            io.write(line_str + "\n")
             conversation_log.append(line_str)
 
-        resp = get_input_nonblocking("\nChoose (1,2,3): ", total_time, start_time, penalty)
+        resp = get_input_nonblocking("\nChoose (1,2,3): ", total_time, start_time, penalty, io)
         if resp is None:
-            print("\nTime's up mid-conversation!")
+            io.write("\nTime's up mid-conversation!\n")
             conversation_log.append("\n[Time ended mid-conversation!]")
             stop_event.set()
             tthread.join()
             return synergy_score, conversation_log
         while resp not in ["1","2","3"]:
-            print("Invalid choice. +10s penalty.")
+            io.write("Invalid choice. +10s penalty.\n")
             penalty[0] += 10
             conversation_log.append(f"[Invalid => +10s penalty (User typed {resp})]")
-            resp = get_input_nonblocking("Choose (1,2,3): ", total_time, start_time, penalty)
+            resp = get_input_nonblocking("Choose (1,2,3): ", total_time, start_time, penalty, io)
             if resp is None:
-                print("\nTime's up after invalid input.")
+                io.write("\nTime's up after invalid input.\n")
                 conversation_log.append("\n[Time ended after invalid attempt!]")
                 stop_event.set()
                 tthread.join()
                 return synergy_score, conversation_log
 
         synergy_tags = inter["options"][resp]["synergy"]
-        # Now compute synergy + a breakdown
-        synergy_val, detail_str = compute_choice_synergy_breakdown(mc_stats, target_stats, victim_stats, synergy_tags, luck_factor)
+        formula = synergy_formulas.get((idx, int(resp))) if synergy_formulas else None
+        if formula is not None:
+            synergy_val = formula(stats_by_abbr(mc_stats, target_stats, victim_stats))
+            detail_str = f"[Detail] formula {formula.key}: {formula.source} => final= {synergy_val:.2f}"
+        else:
+            # Now compute synergy + a breakdown
+            synergy_val, detail_str = compute_choice_synergy_breakdown(mc_stats, target_stats, victim_stats, synergy_tags, luck_factor)
         synergy_score += synergy_val
+        if choices is not None:
+            choices.append((idx, int(resp), synergy_val))
         synergy_msg = f"[Chose {resp}, synergy +{synergy_val:.2f}]"
         conversation_log.append(synergy_msg)
         conversation_log.append(detail_str)
-        print(synergy_msg + "\n")
+        conversation_log.checkpoint()
+        io.write(synergy_msg + "\n\n")
 
     stop_event.set()
     tthread.join()
     return synergy_score, conversation_log
 
+# Synergy tag -> full stat name, per side
+MC_TAG_MAP = {
+    "Presence":"Presence (PRS)",
+    "Adaptability":"Adaptability (ADP)",
+    "Instinct":"Instinct (INS)",
+    "Will":"Will (WIL)",
+    "Projection":"Projection (PJT)",
+    "Conviction":"Conviction (CVT)",
+    "Resonance":"Resonance (RSN)",
+    "Spirit":"Spirit (SPT)"
+}
+TARGET_TAG_MAP = {
+    "Anchoring":"Emotional Anchoring (EAC)",
+    "ThrillIncl":"Thrill Inclination (THI)",
+    "Autonomy":"Autonomy Drive (ATD)",
+    "Masking":"Social Masking (SOM)",
+    "RPM":"Response Momentum (RPM)"
+}
+RIVAL_TAG_MAP = {
+    "SCM":"Social Command (SCM)",
+    "IAW":"Instinctive Awareness (IAW)",
+    "RLP":"Relational Pull (RLP)",
+    "ELG":"Emotional Leverage (ELG)"
+}
+
 def compute_choice_synergy_breakdown(mc_stats, target_stats, victim_stats, synergy_tags, luck_factor):
     """
     Returns synergy_line + a detail string explaining the synergy breakdown:
@@ -555,34 +651,9 @@ def compute_choice_synergy_breakdown(mc_stats, target_stats, victim_stats, syner
     tgt_total = 0.0
     rv_penalty = 0.0
 
-    # For easier referencing
-    mc_map = {
-        "Presence":"Presence (PRS)",
-        "Adaptability":"Adaptability (ADP)",
-        "Instinct":"Instinct (INS)",
-        "Will":"Will (WIL)",
-        "Projection":"Projection (PJT)",
-        "Conviction":"Conviction (CVT)",
-        "Resonance":"Resonance (RSN)",
-        "Spirit":"Spirit (SPT)"
-    }
-    tgt_map = {
-        "Anchoring":"Emotional Anchoring (EAC)",
-        "ThrillIncl":"Thrill Inclination (THI)",
-        "Autonomy":"Autonomy Drive (ATD)",
-        "Masking":"Social Masking (SOM)",
-        "RPM":"Response Momentum (RPM)"
-    }
-    rv_map = {
-        "SCM":"Social Command (SCM)",
-        "IAW":"Instinctive Awareness (IAW)",
-        "RLP":"Relational Pull (RLP)",
-        "ELG":"Emotional Leverage (ELG)"
-    }
-
     # Gains from MC
     for shortn in synergy_tags.get("MC_needed", []):
-        fk = mc_map.get(shortn)
+        fk = MC_TAG_MAP.get(shortn)
         if fk and fk in mc_stats:
             ratio = mc_stats[fk]/64.0
             gain = ratio*1.2
@@ -590,7 +661,7 @@ def compute_choice_synergy_breakdown(mc_stats, target_stats, victim_stats, syner
 
     # Gains from Target
     for shortn in synergy_tags.get("Target_needed", []):
-        fk = tgt_map.get(shortn)
+        fk = TARGET_TAG_MAP.get(shortn)
         if fk and fk in target_stats:
             ratio = target_stats[fk]/64.0
             gain = ratio*1.2
@@ -598,7 +669,7 @@ def compute_choice_synergy_breakdown(mc_stats, target_stats, victim_stats, syner
 
     # Rival penalty
     for shortn in synergy_tags.get("Victim_risk", []):
-        fk = rv_map.get(shortn)
+        fk = RIVAL_TAG_MAP.get(shortn)
         if fk and fk in victim_stats:
             ratio = victim_stats[fk]/64.0
             penalty = ratio*2.0
@@ -624,15 +695,67 @@ def compute_choice_synergy_breakdown(mc_stats, target_stats, victim_stats, syner
     detail_str = "[Detail] " + " ".join(detail_list)
     return synergy_line, detail_str
 
+def synergy_tags_formula(synergy_tags):
+    """
+    The built-in breakdown above as formula source (see formulas.py),
+    same operations in the same order so results match exactly.
+    This is what 'BASE' means in a designer formula.
+    """
+    def gains(tags, tag_map, weight):
+        terms = [f"{tag_map[t][-4:-1]} / 64.0 * {weight}" for t in tags if t in tag_map]
+        return "(0.0 + " + " + ".join(terms) + ")" if terms else "0.0"
+    mc = gains(synergy_tags.get("MC_needed", []), MC_TAG_MAP, 1.2)
+    tgt = gains(synergy_tags.get("Target_needed", []), TARGET_TAG_MAP, 1.2)
+    rv = gains(synergy_tags.get("Victim_risk", []), RIVAL_TAG_MAP, 2.0)
+    return f"(2.0 + {mc} + {tgt} - {rv}) * (1 + (SPT - 32) / 32 * 0.05)"
+
+def stats_by_abbr(mc_stats, target_stats, victim_stats):
+    """{'PRS': 40, 'THI': 31, ...} as formulas take them."""
+    out = {}
+    for stats in (mc_stats, target_stats, victim_stats):
+        for name, val in stats.items():
+            out[name[-4:-1]] = val
+    return out
+
+def load_synergy_formulas(path=None):
+    """
+    Designer formulas for the shower talk, compiled once.
+    Path: 'path', else NTR_FORMULAS, else 'synergy_formulas.json'.
+    Only that last default is optional ({} when absent); a named file
+    that is missing or bad raises FormulaError.
+    """
+    if path is None:
+        path = os.environ.get("NTR_FORMULAS")
+    if not path:
+        path = "synergy_formulas.json"
+        if not os.path.exists(path):
+            return {}
+    return formulas.load_formulas(path, SHOWER_TALK_SCENE, SHOWER_TALK, synergy_tags_formula)
+
 ##########################################################
 # H) MAIN
 ##########################################################
 
 def main():
+    # Opt-in memory accounting (NTR_MEMPROFILE=1), see memprofile.py
+    profiler = memprofile.profiler_from_env(__file__)
+    # Designer synergy formulas; a bad file stops here, before play starts
+    try:
+        synergy_formulas = load_synergy_formulas()
+    except formulas.FormulaError as e:
+        print(f"Formula file rejected: {e}. Exiting.")
+        return
+    # Pick-set strength table (built by picksets.py); None if not built
+    # or built from other formulas than the ones just loaded
+    pickset_table = picksets.load_table(
+        expected=picksets.current_fingerprint(sys.modules[__name__], synergy_formulas))
+
     print_stat_explanations()
     print("\n=== Final Extended NTR Example (Harder) with Spirit as Luck + Detailed Breakdown ===")
     print("We'll gather name, age, pick stats, synergy with a detailed breakdown in the final log.\n")
     input("Press Enter to begin...")
+    if profiler:
+        profiler.phase("intro")
 
     # 1) Basic user info
     user_name = input("What is your name? ").strip()
@@ -656,13 +779,19 @@ def main():
 
     print(f"\nHello {user_name}, age {user_age}, you are {user_gender}, aiming for a {target_gender} target.\n")
     input("Press Enter to pick your MC stats...")
+    if profiler:
+        profiler.phase("user_info")
 
     # 2) MC Stats
-    mc_stats = choose_stats()
+    mc_stats, chosen_stats = choose_stats(pickset_table)
+    if profiler:
+        profiler.phase("mc_stats")
 
     # 3) Rival & Target
     victim_stats = generate_ntr_victim_stats()
     target_stats = generate_ntr_target_stats()
+    if profiler:
+        profiler.phase("rival_target_stats")
 
     # Sibling
     sibling_age_status = random.choice(["older","younger","twins"])
@@ -728,25 +857,27 @@ def main():
     cchoice = input("Enter choice (1-3): ").strip()
     while cchoice not in ["1","2","3"]:
         cchoice = input("Enter choice (1-3): ").strip()
+    if profiler:
+        profiler.phase("scenario")
 
     synergy_score = 0.0
-    conversation_log = []
+    # Each answered interaction is written to this session's own
+    # ntr_convlog_*.log in the working dir; removed once results are written
+    conversation_log = ConversationLog(spill_dir=".", durable=True)
+    choices = []
     if cchoice in ["1","2"]:
         print("\n[You decide to talk with synergy-based approach (Hard + Spirit luck).]\n")
-        synergy_score, conversation_log = synergy_convo(mc_stats, target_stats, victim_stats)
+        synergy_score, conversation_log = synergy_convo(mc_stats, target_stats, victim_stats,
+                                                        log=conversation_log, choices=choices,
+                                                        synergy_formulas=synergy_formulas)
     else:
         print("\n[You remain silent, no synergy conversation.]\n")
+    if profiler:
+        profiler.phase("synergy_convo")
 
     # Evaluate synergy
-    outcome_str = "No conversation"
+    outcome_str = synergy_outcome(synergy_score)
     max_synergy = 3*10
-    if synergy_score > 0:
-        if synergy_score >= 25:
-            outcome_str = "NTR Option Unlocked!"
-        elif synergy_score >= 15:
-            outcome_str = "Partially intrigued"
-        else:
-            outcome_str = "Unimpressed"
 
     # 4) Write final results
     file_name = "results_synergy.txt"
@@ -781,6 +912,13 @@ def main():
                 f.write(line + "\n")
         else:
             f.write("\nUser stayed silent => no synergy conversation.\n")
+    conversation_log.close(remove=True)
+
+    # Also append to the cross-session store (query with resultstore.py)
+    resultstore.append_row(resultstore.session_row(
+        mc_stats, chosen_stats, victim_stats, target_stats,
+        sibling_age_status, new_shower, cchoice in ["1","2"],
+        choices, synergy_score, outcome_str))
 
     if synergy_score > 0:
         print(f"\nConversation synergy= {synergy_score:.2f}/{max_synergy}")
@@ -788,6 +926,10 @@ def main():
     else:
         print("\nNo synergy conversation happened.")
 
+    if profiler:
+        profiler.phase("results_written")
+        memprofile.finish(profiler)
+
     print(f"\nDetailed synergy breakdown saved to '{file_name}'. Press Enter to exit.")
     input()
 
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+In-process load test for the synergy conversation.
+
+Runs N scripted synergy_convo() sessions at once inside one process.
+Each session gets its own ScriptedIO that "types" answers with
+synthetic delays, so no real terminal is needed. Two phases run:
+
+  idle   - sessions that never answer, to measure time-out accuracy
+           and the CPU an idle (waiting) session burns
+  active - sessions that answer every prompt, to measure
+           per-keystroke echo latency
+
+The JSON report has stable keys so runs can be diffed between versions:
+
+  python loadtest.py --sessions 2000 --report new.json
+  python loadtest.py --compare old.json new.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+import gameNTR
+
+##########################################################
+# 0) Scripted session I/O
+##########################################################
+
+CHOOSE_PROMPT = "Choose (1,2,3): "
+
+class ScriptedIO:
+    """
+    Stand-in for gameNTR.TerminalIO.
+    Every time the game shows the 'Choose' prompt, the next answer is
+    queued as keystrokes with think + typing delays. read_char() blocks
+    like select() would, and write() notices the echo of the last key
+    so the key->echo latency can be recorded. 'threads' collects every
+    thread that uses this io: the session's own and its timer (which
+    reads 'lines' first thing), so threads per session can be counted
+    without depending on timing.
+    """
+    def __init__(self, answers, rng, think=(0.2, 1.0), key_delay=(0.03, 0.15)):
+        self.answers = deque(answers)
+        self.rng = rng
+        self.think = think
+        self.key_delay = key_delay
+        self.pending = deque()      # (char, due perf_counter)
+        self.awaiting_echo = None   # due time of last delivered key
+        self.echo_latencies = []
+        self.bytes_out = 0
+        self.threads = set()
+
+    @property
+    def lines(self):
+        self.threads.add(threading.get_ident())
+        return 24
+
+    def write(self, text):
+        now = time.perf_counter()
+        self.threads.add(threading.get_ident())
+        self.bytes_out += len(text)
+        # The timer thread also writes here; its line starts with ESC.
+        if self.awaiting_echo is not None and not text.startswith("\033"):
+            self.echo_latencies.append(now - self.awaiting_echo)
+            self.awaiting_echo = None
+        if text.endswith(CHOOSE_PROMPT) and self.answers:
+            due = now + self.rng.uniform(*self.think)
+            for ch in self.answers.popleft():
+                self.pending.append((ch, due))
+                due += self.rng.uniform(*self.key_delay)
+
+    def read_char(self, timeout=0.05):
+        if self.pending:
+            due = self.pending[0][1]
+            wait = due - time.perf_counter()
+            if wait > timeout:
+                time.sleep(timeout)
+                return None
+            if wait > 0:
+                time.sleep(wait)
+            ch, due = self.pending.popleft()
+            self.awaiting_echo = due
+            return ch
+        time.sleep(timeout)
+        return None
+
+def random_answers(rng, typo_rate):
+    """Three valid answers; some with a typo fixed by backspace."""
+    answers = []
+    for _ in range(3):
+        pick = rng.choice("123")
+        if rng.random() < typo_rate:
+            answers.append(rng.choice("123") + "\x7f" + pick + "\r")
+        else:
+            answers.append(pick + "\r")
+    return answers
+
+def random_stats():
+    mc = gameNTR.roll_mc_stats([])
+    return mc, gameNTR.generate_ntr_target_stats(), gameNTR.generate_ntr_victim_stats()
+
+##########################################################
+# A) Running a phase
+##########################################################
+
+def percentiles(values, scale=1000.0):
+    """p50/p90/p99/max of 'values' (seconds), reported in ms."""
+    if not values:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+    vals = sorted(values)
+    n = len(vals)
+    def pick(q):
+        return round(vals[min(n - 1, int(q * n))] * scale, 3)
+    return {
+        "count": n,
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": round(vals[-1] * scale, 3),
+    }
+
+def run_phase(n_sessions, total_time, make_io, ramp):
+    """
+    Starts n_sessions threads each running synergy_convo() with its own io.
+    Sessions wait at a start gate until every thread exists, so they all
+    overlap however long start-up takes. CPU and wall clocks cover
+    start-up too, and a monitor thread samples the peak thread count.
+    Returns (results, ios, monitor) where results[i] = (elapsed, timed_out).
+    """
+    results = [None] * n_sessions
+    ios = [make_io(i) for i in range(n_sessions)]
+    gate = threading.Event()
+
+    def session(i):
+        mc, tgt, vic = random_stats()
+        gate.wait()
+        t0 = time.perf_counter()
+        _, log = gameNTR.synergy_convo(mc, tgt, vic, io=ios[i], total_time=total_time)
+        timed_out = any("[Time ended" in line for line in log)
+        results[i] = (time.perf_counter() - t0, timed_out)
+
+    threads_before = threading.active_count()
+    peak = [threads_before]
+    done = threading.Event()
+
+    def monitor_threads():
+        while not done.is_set():
+            peak[0] = max(peak[0], threading.active_count())
+            done.wait(0.02)
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    mon = threading.Thread(target=monitor_threads, daemon=True)
+    mon.start()
+
+    threads = []
+    for i in range(n_sessions):
+        t = threading.Thread(target=session, args=(i,), daemon=True)
+        t.start()
+        threads.append(t)
+        if ramp:
+            time.sleep(ramp)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    done.set()
+    mon.join()
+    monitor = {
+        "wall_s": time.perf_counter() - started,
+        "cpu_s": time.process_time() - cpu_started,
+        "peak_threads": peak[0],
+        # counted per session, not from the peak: early sessions may
+        # have ended before the last ones started
+        "session_threads": sum(len(io.threads) for io in ios),
+    }
+    return results, ios, monitor
+
+def run_load(args):
+    if args.stack_kb:
+        threading.stack_size(args.stack_kb * 1024)
+    random.seed(args.seed)
+    report = {
+        "label": args.label,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "sessions": args.sessions,
+            "idle_timeout_s": args.idle_timeout,
+            "active_timeout_s": args.active_timeout,
+            "typo_rate": args.typo_rate,
+            "stack_kb": args.stack_kb,
+            "seed": args.seed,
+        },
+    }
+
+    # Idle: nobody types, every session must end on its time-out.
+    print(f"[idle] {args.sessions} sessions, {args.idle_timeout}s time-out...")
+    results, _, mon = run_phase(
+        args.sessions, args.idle_timeout,
+        lambda i: ScriptedIO([], random.Random(args.seed + i)), args.ramp)
+    overshoot = [max(0.0, el - args.idle_timeout) for el, _ in results]
+    report["idle"] = {
+        "sessions": args.sessions,
+        "timed_out": sum(1 for _, to in results if to),
+        "timeout_overshoot_ms": percentiles(overshoot),
+        "cpu_ms_per_session_per_s": round(
+            mon["cpu_s"] / max(mon["wall_s"], 1e-9) / args.sessions * 1000, 4),
+        "peak_threads": mon["peak_threads"],
+        "threads_per_session": round(mon["session_threads"] / args.sessions, 3),
+    }
+
+    # Active: every session answers all three prompts.
+    print(f"[active] {args.sessions} sessions answering...")
+    results, ios, mon = run_phase(
+        args.sessions, args.active_timeout,
+        lambda i: ScriptedIO(random_answers(random.Random(args.seed + i), args.typo_rate),
+                             random.Random(args.seed + i)),
+        args.ramp)
+    latencies = [lat for io in ios for lat in io.echo_latencies]
+    report["active"] = {
+        "sessions": args.sessions,
+        "completed": sum(1 for _, to in results if not to),
+        "timed_out": sum(1 for _, to in results if to),
+        "session_wall_ms": percentiles([el for el, _ in results]),
+        "echo_latency_ms": percentiles(latencies),
+        "cpu_s": round(mon["cpu_s"], 3),
+        "peak_threads": mon["peak_threads"],
+    }
+    return report
+
+##########################################################
+# B) Comparing reports
+##########################################################
+
+def flatten(d, prefix=""):
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
+
+def compare(old_path, new_path):
+    with open(old_path, encoding="utf-8") as f:
+        old = flatten(json.load(f))
+    with open(new_path, encoding="utf-8") as f:
+        new = flatten(json.load(f))
+    print(f"{'metric':<42} {'old':>12} {'new':>12} {'change':>9}")
+    for key in sorted(set(old) | set(new)):
+        a, b = old.get(key), new.get(key)
+        if a is not None and b is not None and a != 0:
+            change = f"{(b - a) / abs(a) * 100:+.1f}%"
+        else:
+            change = ""
+        print(f"{key:<42} {str(a):>12} {str(b):>12} {change:>9}")
+
+##########################################################
+# C) MAIN
+##########################################################
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load test synergy_convo with scripted sessions.")
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--idle-timeout", type=float, default=5.0,
+                    help="conversation time limit for the idle phase (s)")
+    ap.add_argument("--active-timeout", type=float, default=90.0,
+                    help="conversation time limit for the active phase (s)")
+    ap.add_argument("--typo-rate", type=float, default=0.2)
+    ap.add_argument("--ramp", type=float, default=0.0,
+                    help="delay between session starts (s)")
+    ap.add_argument("--stack-kb", type=int, default=256,
+                    help="thread stack size, 0 = interpreter default")
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--label", default="")
+    ap.add_argument("--report", default="loadtest_report.json")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    report = run_load(args)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(json.dumps(report, indent=2, sort_keys=True))
+    print(f"\nReport saved to '{args.report}'.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
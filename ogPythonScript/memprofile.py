@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in per-session memory accounting, built on tracemalloc.
+
+Interactive run: set NTR_MEMPROFILE=1 (and optionally NTR_MEM_BUDGET,
+e.g. 64KiB). main() snapshots after each phase; at the end the
+per-subsystem breakdown plus peak/retained bytes is printed and saved to
+'results_memory.txt'. Going over the budget raises MemoryBudgetExceeded.
+
+Headless footprint check (exit code 1 when a session is over budget):
+  python memprofile.py --sessions 20 --budget 64KiB
+"""
+import ast
+import os
+import sys
+import threading
+import tracemalloc
+
+# Unix only; without it the thread stack size falls back to 8 MiB.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+OWN_FILE = os.path.abspath(__file__)
+GAME_DIR = os.path.dirname(OWN_FILE)
+PROFILER = "<profiler>"   # our own bookkeeping, left out of the totals
+
+##########################################################
+# 0) Budget parsing
+##########################################################
+
+_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "kib": 1024,
+          "m": 1024**2, "mb": 1024**2, "mib": 1024**2}
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+def parse_bytes(text):
+    """'65536', '64k', '64KiB', '1.5M' -> bytes (int)."""
+    s = str(text).strip().lower()
+    num = s.rstrip("kmib")
+    unit = s[len(num):]
+    if unit not in _UNITS:
+        raise ValueError(f"Bad size '{text}'")
+    return int(float(num) * _UNITS[unit])
+
+##########################################################
+# A) Attributing allocations to subsystems
+##########################################################
+
+# gameNTR functions -> subsystem label (others keep the function name)
+FUNC_SUBSYSTEM = {
+    "choose_stats": "mc_stats",
+    "roll_mc_stats": "mc_stats",
+    "roll_stat_bell": "stat_rolls",
+    "roll_stat_bell_chosen": "stat_rolls",
+    "generate_ntr_victim_stats": "rival_stats",
+    "generate_ntr_target_stats": "target_stats",
+    "compute_choice_synergy_breakdown": "synergy_math",
+    "get_input_nonblocking": "input",
+    "update_timer": "timer_thread",
+}
+
+# synergy_convo locals that only exist to be logged
+LOG_NAMES = {"conversation_log", "line_str", "synergy_msg"}
+
+# helper modules next to the game -> subsystem label (others keep the module name)
+MODULE_SUBSYSTEM = {
+    "convlog": "conversation_log",
+    "loadtest": "harness_io",
+}
+
+def _stmt_ranges(source_file):
+    """
+    Line ranges inside the game script:
+      functions -> (start, end, subsystem)
+      plus finer ranges inside synergy_convo for every statement
+      building conversation_log lines. (The interactions themselves are
+      the module-level SHOWER_TALK, built once at import, so no session
+      allocates them.)
+    Finer ranges come last so they win.
+    """
+    with open(source_file, encoding="utf-8-sig") as f:
+        tree = ast.parse(f.read())
+    ranges = []
+    fine = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        ranges.append((node.lineno, node.end_lineno, FUNC_SUBSYSTEM.get(node.name, node.name)))
+        if node.name != "synergy_convo":
+            continue
+        for stmt in ast.walk(node):
+            if not isinstance(stmt, (ast.Assign, ast.Expr, ast.AugAssign)):
+                continue
+            names = {n.id for n in ast.walk(stmt) if isinstance(n, ast.Name)}
+            if names & LOG_NAMES:
+                fine.append((stmt.lineno, stmt.end_lineno, "conversation_log"))
+    return ranges + fine
+
+class _Attributor:
+    def __init__(self, source_file):
+        self.source_file = os.path.abspath(source_file)
+        self.ranges = _stmt_ranges(self.source_file)
+        self.threading_file = os.path.abspath(threading.__file__)
+        self.cache = {}
+
+    def label(self, traceback):
+        # innermost frame we know about decides
+        for frame in reversed(traceback):
+            key = (frame.filename, frame.lineno)
+            if key in self.cache:
+                return self.cache[key]
+            fname = frame.filename
+            path = os.path.abspath(fname)
+            lab = None
+            if fname.startswith("<"):
+                pass   # frozen stdlib module, keep walking out
+            elif path == self.source_file:
+                for start, end, name in self.ranges:
+                    if start <= frame.lineno <= end:
+                        lab = name
+            elif path == OWN_FILE:
+                lab = PROFILER
+            elif path == self.threading_file:
+                lab = "timer_thread"
+            elif os.path.dirname(path) == GAME_DIR:
+                mod = os.path.splitext(os.path.basename(fname))[0]
+                lab = MODULE_SUBSYSTEM.get(mod, mod)
+            if lab:
+                self.cache[key] = lab
+                return lab
+        return "other"
+
+    def totals(self, snapshot):
+        out = {}
+        for stat in snapshot.statistics("traceback"):
+            lab = self.label(stat.traceback)
+            if lab != PROFILER:
+                out[lab] = out.get(lab, 0) + stat.size
+        return out
+
+##########################################################
+# B) Profiler
+##########################################################
+
+def thread_stack_reserved():
+    """Stack reserved per new thread (virtual; tracemalloc can't see it)."""
+    size = threading.stack_size()
+    if size:
+        return size
+    if resource is None:
+        return 8 * 1024**2
+    soft, _ = resource.getrlimit(resource.RLIMIT_STACK)
+    return soft if soft != resource.RLIM_INFINITY else 8 * 1024**2
+
+class MemoryProfiler:
+    """
+    Snapshot-per-phase accounting for one session.
+      start() -> phase(name) ... -> stop() returns the report dict.
+    Bytes are relative to start(): peak = highest traced memory seen,
+    retained = what is still allocated at stop().
+    """
+    def __init__(self, source_file, budget=None, nframes=16):
+        self.attrib = _Attributor(source_file)
+        self.budget = budget
+        self.nframes = nframes
+        self.phases = []
+        self._own_tracing = False
+
+    def _snapshot_totals(self):
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        return self.attrib.totals(snap)
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+            self._own_tracing = True
+        self.base = self._snapshot_totals()
+        self.last = self.base
+        self.base_current = tracemalloc.get_traced_memory()[0]
+        self.peak = 0
+        tracemalloc.reset_peak()
+
+    def phase(self, name):
+        # read the peak before snapshotting, the snapshot itself allocates
+        _, peak = tracemalloc.get_traced_memory()
+        totals = self._snapshot_totals()
+        delta = {k: totals.get(k, 0) - self.last.get(k, 0)
+                 for k in set(totals) | set(self.last)}
+        self.phases.append({
+            "phase": name,
+            "peak_bytes": max(0, peak - self.base_current),
+            "delta_by_subsystem": {k: v for k, v in delta.items() if v},
+        })
+        self.peak = max(self.peak, peak - self.base_current)
+        self.last = totals
+        tracemalloc.reset_peak()
+
+    def stop(self):
+        self.phase("end")
+        retained = {k: self.last.get(k, 0) - self.base.get(k, 0)
+                    for k in set(self.last) | set(self.base)}
+        if self._own_tracing:
+            tracemalloc.stop()
+        return {
+            "peak_bytes": self.peak,
+            "retained_bytes": sum(retained.values()),
+            "retained_by_subsystem": {k: v for k, v in retained.items() if v},
+            "thread_stack_reserved_bytes": thread_stack_reserved(),
+            "budget_bytes": self.budget,
+            "phases": self.phases,
+        }
+
+    def check_budget(self, report):
+        if self.budget is not None and report["peak_bytes"] > self.budget:
+            raise MemoryBudgetExceeded(
+                f"Session peak {report['peak_bytes']} B > budget {self.budget} B")
+
+def format_report(report):
+    lines = ["=== Session Memory Footprint ===",
+             f"Peak: {report['peak_bytes']} B   Retained: {report['retained_bytes']} B",
+             f"Timer thread stack (reserved, untracked): {report['thread_stack_reserved_bytes']} B"]
+    if report["budget_bytes"] is not None:
+        lines.append(f"Budget: {report['budget_bytes']} B")
+    lines.append("\nRetained by subsystem:")
+    for k, v in sorted(report["retained_by_subsystem"].items(), key=lambda kv: -kv[1]):
+        lines.append(f"  {k}: {v} B")
+    lines.append("\nPer phase (peak, then growth by subsystem):")
+    for ph in report["phases"]:
+        lines.append(f"  {ph['phase']}: peak {ph['peak_bytes']} B")
+        for k, v in sorted(ph["delta_by_subsystem"].items(), key=lambda kv: -abs(kv[1])):
+            lines.append(f"      {k}: {v:+d} B")
+    return "\n".join(lines)
+
+def profiler_from_env(source_file):
+    """MemoryProfiler if NTR_MEMPROFILE is set, else None."""
+    if os.environ.get("NTR_MEMPROFILE", "") in ("", "0"):
+        return None
+    budget = os.environ.get("NTR_MEM_BUDGET")
+    prof = MemoryProfiler(source_file, parse_bytes(budget) if budget else None)
+    prof.start()
+    return prof
+
+def finish(profiler, file_name="results_memory.txt"):
+    """Stop, print + save the report, then enforce the budget."""
+    report = profiler.stop()
+    text = format_report(report)
+    print("\n" + text)
+    with open(file_name, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+    profiler.check_budget(report)
+    return report
+
+##########################################################
+# C) Headless footprint check
+##########################################################
+
+def run_headless(n_sessions, budget):
+    """
+    Runs n_sessions scripted synergy sessions one after another, each
+    under its own profiler. Returns the list of per-session reports.
+    """
+    import random
+    import gameNTR
+    from loadtest import ScriptedIO, random_answers, random_stats
+
+    kept = []   # sessions stay referenced so 'retained' is meaningful
+    reports = []
+    for i in range(n_sessions):
+        rng = random.Random(i)
+        io = ScriptedIO(random_answers(rng, 0.2), rng, think=(0, 0), key_delay=(0, 0))
+        prof = MemoryProfiler(gameNTR.__file__, budget)
+        prof.start()
+        mc, tgt, vic = random_stats()
+        prof.phase("stats")
+        score, log = gameNTR.synergy_convo(mc, tgt, vic, io=io)
+        prof.phase("synergy_convo")
+        kept.append((mc, tgt, vic, score, log))
+        reports.append(prof.stop())
+    return reports
+
+def main(argv=None):
+    import argparse
+    import json
+    ap = argparse.ArgumentParser(description="Per-session memory footprint check.")
+    ap.add_argument("--sessions", type=int, default=10)
+    ap.add_argument("--budget", default=None, help="max peak bytes per session, e.g. 64KiB")
+    ap.add_argument("--json", action="store_true", help="print all reports as JSON")
+    args = ap.parse_args(argv)
+    budget = parse_bytes(args.budget) if args.budget else None
+
+    reports = run_headless(args.sessions, budget)
+    if args.json:
+        print(json.dumps(reports, indent=2, sort_keys=True))
+    else:
+        print(format_report(reports[-1]))
+    peaks = [r["peak_bytes"] for r in reports]
+    retained = [r["retained_bytes"] for r in reports]
+    print(f"\n{len(reports)} sessions: peak max {max(peaks)} B, "
+          f"retained mean {sum(retained) // len(retained)} B")
+    over = [i for i, r in enumerate(reports) if budget is not None and r["peak_bytes"] > budget]
+    if over:
+        print(f"FAIL: {len(over)} session(s) over budget {budget} B")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
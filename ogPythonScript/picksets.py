@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed strength of every character-creation pick set.
+
+choose_stats() allows 4 of the 7 non-Spirit stats, or Spirit + 1 other:
+C(7,4) + 7 = 42 pick sets. Each one shifts the MC roll (chosen stats
+mu=40 clamped [20..64], the rest mu=32 clamped [1..64]). The build step
+simulates every pick set against random Rivals/Targets through the
+shower-talk synergy formulas and stores, per set:
+
+  ev_random  - expected conversation total picking options at random
+  ev_best    - expected total when always picking the best option
+  p_unlock / p_partial / p_unimpressed - outcome tiers under best play
+
+as a small binary table next to this file. The game loads it at startup
+and looks pick sets up by their bitmask in O(1).
+
+Build (re-run after changing stats, interactions or synergy formulas):
+  python picksets.py --samples 20000
+Show:
+  python picksets.py --show
+"""
+import hashlib
+import json
+import os
+import random
+import struct
+import sys
+import time
+from itertools import combinations
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pickset_table.bin")
+MAGIC = b"NTRP"
+VERSION = 1
+# magic, version, record count, samples per set, formula fingerprint
+_HEADER = struct.Struct("<4sHHI8s")
+# mask, ev_random, ev_best, p_unlock, p_partial, p_unimpressed
+_RECORD = struct.Struct("<B5f")
+FIELDS = ("ev_random", "ev_best", "p_unlock", "p_partial", "p_unimpressed")
+
+# The MC/Rival/Target roll simulate_numpy assumes, as in roll_stat_bell
+# and roll_stat_bell_chosen: (mu, lo, hi), sigma 10
+ROLL_SIGMA = 10
+ROLL_CHOSEN = (40, 20, 64)
+ROLL_OTHER = (32, 1, 64)
+
+##########################################################
+# 0) Pick sets
+##########################################################
+
+def all_pick_sets(mc_stat_names):
+    """Every legal choose_stats() outcome, as lists of stat names."""
+    spirit = "Spirit (SPT)"
+    others = [s for s in mc_stat_names if s != spirit]
+    sets = [list(c) for c in combinations(others, 4)]
+    sets += [[spirit, s] for s in others]
+    return sets
+
+##########################################################
+# A) Simulation
+##########################################################
+
+def option_formulas(game, designer):
+    """
+    {(interaction, option): Formula} - the designer formula (from
+    game.load_synergy_formulas()) or BASE.
+    """
+    import formulas
+    out = {}
+    for i, inter in enumerate(game.SHOWER_TALK):
+        for k, optdata in inter["options"].items():
+            out[(i, int(k))] = designer.get((i, int(k))) or formulas.Formula(
+                "BASE", f"{game.SHOWER_TALK_SCENE}.{i + 1}.{k}",
+                base=game.synergy_tags_formula(optdata["synergy"]))
+    return out
+
+def fingerprint(game, opt_formulas):
+    """
+    8 bytes identifying what a table was built from: every option's
+    formula with BASE expanded, the outcome tiers and the roll model.
+    """
+    blob = json.dumps({
+        "formulas": sorted((f"{i}.{k}", f.key, f.source, f.base)
+                           for (i, k), f in opt_formulas.items()),
+        "tiers": [game.UNLOCK_AT, game.PARTIAL_AT],
+        "roll": [ROLL_SIGMA, ROLL_CHOSEN, ROLL_OTHER],
+    })
+    return hashlib.sha1(blob.encode("utf-8")).digest()[:8]
+
+def current_fingerprint(game, designer):
+    """fingerprint() of the game as it is, with 'designer' formulas loaded."""
+    return fingerprint(game, option_formulas(game, designer))
+
+def _tiers(best_totals, game):
+    """Fractions of (unlock, partial, unimpressed) for an iterable of totals."""
+    n = unlock = partial = 0
+    for t in best_totals:
+        n += 1
+        outcome = game.synergy_outcome(t)
+        unlock += outcome == "NTR Option Unlocked!"
+        partial += outcome == "Partially intrigued"
+    return unlock / n, partial / n, (n - unlock - partial) / n
+
+def simulate_numpy(game, chosen, opt_formulas, samples, rng):
+    from resultstore import RIVAL_ABBRS, TARGET_ABBRS
+    # same as roll_stat_bell(_chosen): int() truncates, then clamp
+    def bell(roll):
+        mu, lo, hi = roll
+        return np.clip(np.trunc(rng.normal(mu, ROLL_SIGMA, samples)), lo, hi)
+    cols = {}
+    for name in game.MC_STAT_NAMES:
+        cols[name[-4:-1]] = bell(ROLL_CHOSEN if name in chosen else ROLL_OTHER)
+    for a in RIVAL_ABBRS + TARGET_ABBRS:
+        cols[a] = bell(ROLL_OTHER)
+
+    best = np.zeros(samples)
+    ev_random = 0.0
+    for i, inter in enumerate(game.SHOWER_TALK):
+        per_opt = np.stack([opt_formulas[(i, int(k))].columns(cols) for k in inter["options"]])
+        best += per_opt.max(axis=0)
+        ev_random += float(per_opt.mean())
+    # 'No conversation' only happens at 0, which best play never scores
+    p_unlock = float(np.mean(best >= game.UNLOCK_AT))
+    p_partial = float(np.mean((best >= game.PARTIAL_AT) & (best < game.UNLOCK_AT)))
+    return ev_random, float(best.mean()), p_unlock, p_partial, 1.0 - p_unlock - p_partial
+
+def simulate_python(game, chosen, opt_formulas, samples, rng):
+    random.seed(rng.random())   # gameNTR's rolls use the module-level RNG
+    options = [[opt_formulas[(i, int(k))] for k in inter["options"]]
+               for i, inter in enumerate(game.SHOWER_TALK)]
+    best_totals = []
+    rand_sum = 0.0
+    for _ in range(samples):
+        mc = {s: game.roll_stat_bell_chosen() if s in chosen else game.roll_stat_bell()
+              for s in game.MC_STAT_NAMES}
+        stats = game.stats_by_abbr(mc, game.generate_ntr_target_stats(),
+                                   game.generate_ntr_victim_stats())
+        total = 0.0
+        for opts in options:
+            vals = [f(stats) for f in opts]
+            total += max(vals)
+            rand_sum += sum(vals) / len(vals)
+        best_totals.append(total)
+    return (rand_sum / samples, sum(best_totals) / samples) + _tiers(best_totals, game)
+
+def build_table(samples=20000, seed=2025, formula_path=None, path=TABLE_PATH):
+    import gameNTR as game
+    import resultstore
+    opt_formulas = option_formulas(game, game.load_synergy_formulas(formula_path))
+    if np is not None:
+        rng, sim = np.random.default_rng(seed), simulate_numpy
+    else:
+        rng, sim = random.Random(seed), simulate_python
+
+    records = []
+    for chosen in all_pick_sets(game.MC_STAT_NAMES):
+        mask = resultstore.picks_mask(chosen)
+        records.append((mask,) + tuple(sim(game, set(chosen), opt_formulas, samples, rng)))
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(records), samples, fingerprint(game, opt_formulas)))
+        for rec in records:
+            f.write(_RECORD.pack(*rec))
+    return records
+
+##########################################################
+# B) Loading + lookup
+##########################################################
+
+class PickSetTable:
+    """table[mask] -> {'ev_random': .., 'ev_best': .., 'p_unlock': .., ...} or None."""
+    def __init__(self, records, samples, fingerprint):
+        self.samples = samples
+        self.fingerprint = fingerprint
+        self._by_mask = [None] * 256
+        for mask, *vals in records:
+            self._by_mask[mask] = dict(zip(FIELDS, vals))
+
+    def __getitem__(self, mask):
+        return self._by_mask[mask]
+
+    def __iter__(self):
+        return ((m, r) for m, r in enumerate(self._by_mask) if r is not None)
+
+def load_table(path=TABLE_PATH, expected=None):
+    """
+    PickSetTable, or None if the table hasn't been built (or is unreadable).
+    With 'expected' (see current_fingerprint) a table built from anything
+    else is stale and also gives None.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, count, samples, fp = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or len(data) != _HEADER.size + count * _RECORD.size:
+        return None
+    if expected is not None and fp != expected:
+        return None
+    return PickSetTable(_RECORD.iter_unpack(data[_HEADER.size:]), samples, fp)
+
+##########################################################
+# C) MAIN
+##########################################################
+
+def main(argv=None):
+    import argparse
+    import resultstore
+    ap = argparse.ArgumentParser(description="Build or show the pick-set strength table.")
+    ap.add_argument("--samples", type=int, default=20000, help="simulated sessions per pick set")
+    ap.add_argument("--seed", type=int, default=2025)
+    ap.add_argument("--formulas", default=None,
+                    help="designer formula file (default: NTR_FORMULAS / synergy_formulas.json)")
+    ap.add_argument("--out", default=TABLE_PATH)
+    ap.add_argument("--show", action="store_true", help="print the existing table")
+    args = ap.parse_args(argv)
+
+    if not args.show:
+        started = time.perf_counter()
+        build_table(args.samples, args.seed, args.formulas, args.out)
+        print(f"Built '{args.out}' ({args.samples} samples/set) in "
+              f"{time.perf_counter() - started:.1f}s.")
+
+    table = load_table(args.out)
+    if table is None:
+        print(f"No usable table at '{args.out}'.")
+        return 1
+    import gameNTR
+    designer = gameNTR.load_synergy_formulas(args.formulas)
+    if table.fingerprint != current_fingerprint(gameNTR, designer):
+        print("WARNING: table was built from other formulas, tiers or rolls; rebuild it.")
+    print(f"{'pick set':<20} {'E[random]':>9} {'E[best]':>8} {'unlock':>7} {'partial':>8} {'unimpr.':>8}")
+    for mask, r in sorted(table, key=lambda mr: -mr[1]["ev_best"]):
+        print(f"{resultstore.picks_label(mask):<20} {r['ev_random']:9.2f} {r['ev_best']:8.2f} "
+              f"{r['p_unlock']:7.1%} {r['p_partial']:8.1%} {r['p_unimpressed']:8.1%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar store of every finished session, plus a small query CLI.
+
+Layout (one directory, default 'results_store/'):
+  schema.json   - field names, array typecodes, byte order, label tables
+  <field>.col   - raw values of one field, appended one row per session
+
+Reading memory-maps the .col files (numpy.memmap when numpy is around,
+else mmap + memoryview), so queries never build per-row Python objects
+on the numpy path.
+
+  python resultstore.py summary
+  python resultstore.py unlock-rate --by picks
+  python resultstore.py mean-synergy --by option
+  python resultstore.py mean-synergy --by sibling
+  python resultstore.py rescore synergy_formulas.json
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+
+# numpy is optional: much faster grouping when installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STORE_DIR = "results_store"
+SCHEMA_VERSION = 1
+
+MC_ABBRS = ["PRS", "ADP", "INS", "WIL", "PJT", "CVT", "RSN", "SPT"]
+RIVAL_ABBRS = ["SCM", "EMT", "IAW", "RLG", "ELG", "NCT", "RLP"]
+TARGET_ABBRS = ["EAC", "THI", "ATD", "IJT", "RMW", "SOM", "RPM"]
+N_INTERACTIONS = 3
+
+OUTCOMES = ["No conversation", "Unimpressed", "Partially intrigued", "NTR Option Unlocked!"]
+SIBLINGS = ["older", "younger", "twins"]
+
+# (name, array typecode); 'picks' is a bitmask over MC_ABBRS,
+# optN is the option picked at interaction N (0 = never answered)
+FIELDS = (
+    [("ts", "d")]
+    + [(f"mc_{a}", "B") for a in MC_ABBRS]
+    + [(f"rv_{a}", "B") for a in RIVAL_ABBRS]
+    + [(f"tg_{a}", "B") for a in TARGET_ABBRS]
+    + [("picks", "B"), ("sibling", "B"), ("shower_s", "H"), ("talked", "B")]
+    + [(f"opt{i}", "b") for i in range(1, N_INTERACTIONS + 1)]
+    + [(f"syn{i}", "f") for i in range(1, N_INTERACTIONS + 1)]
+    + [("synergy", "f"), ("outcome", "B")]
+)
+
+##########################################################
+# 0) Writing
+##########################################################
+
+def abbr(stat_name):
+    """'Presence (PRS)' -> 'PRS'"""
+    return stat_name[-4:-1]
+
+def picks_mask(chosen_stats):
+    mask = 0
+    for s in chosen_stats:
+        mask |= 1 << MC_ABBRS.index(abbr(s))
+    return mask
+
+def picks_label(mask):
+    return "+".join(a for i, a in enumerate(MC_ABBRS) if mask & (1 << i)) or "-"
+
+def session_row(mc_stats, chosen_stats, victim_stats, target_stats,
+                sibling, shower_s, talked, choices, synergy_score, outcome_str):
+    """
+    One store row from main()'s end-of-session state.
+    'choices' is the list synergy_convo filled: (interaction, option, synergy).
+    """
+    row = {"ts": time.time()}
+    for stats, prefix in ((mc_stats, "mc_"), (victim_stats, "rv_"), (target_stats, "tg_")):
+        for name, val in stats.items():
+            row[prefix + abbr(name)] = val
+    row["picks"] = picks_mask(chosen_stats)
+    row["sibling"] = SIBLINGS.index(sibling)
+    row["shower_s"] = shower_s
+    row["talked"] = int(talked)
+    for idx, opt, syn in choices:
+        row[f"opt{idx + 1}"] = opt
+        row[f"syn{idx + 1}"] = syn
+    row["synergy"] = synergy_score
+    row["outcome"] = OUTCOMES.index(outcome_str)
+    return row
+
+def _write_schema(store):
+    schema = {
+        "version": SCHEMA_VERSION,
+        "byteorder": sys.byteorder,
+        "fields": [{"name": n, "type": t} for n, t in FIELDS],
+        "labels": {"outcome": OUTCOMES, "sibling": SIBLINGS, "picks": MC_ABBRS},
+    }
+    with open(os.path.join(store, "schema.json"), "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=1)
+
+def append_rows(rows, store=STORE_DIR):
+    """Appends rows (dicts, missing fields = 0) column by column."""
+    if not os.path.isdir(store):
+        os.makedirs(store)
+    if not os.path.exists(os.path.join(store, "schema.json")):
+        _write_schema(store)
+    for name, code in FIELDS:
+        col = array(code, (r.get(name, 0) for r in rows))
+        with open(os.path.join(store, name + ".col"), "ab") as f:
+            col.tofile(f)
+
+def append_row(row, store=STORE_DIR):
+    append_rows([row], store)
+
+##########################################################
+# A) Reading
+##########################################################
+
+def load_schema(store=STORE_DIR):
+    with open(os.path.join(store, "schema.json"), encoding="utf-8") as f:
+        schema = json.load(f)
+    if schema["version"] != SCHEMA_VERSION:
+        raise ValueError(f"Store version {schema['version']}, expected {SCHEMA_VERSION}")
+    if schema["byteorder"] != sys.byteorder:
+        raise ValueError("Store was written on a machine with other byte order")
+    return schema
+
+class Columns:
+    """Memory-mapped read access: cols['synergy'] -> array-like view."""
+    def __init__(self, store=STORE_DIR):
+        self.store = store
+        self.types = {f["name"]: f["type"] for f in load_schema(store)["fields"]}
+        self._maps = []
+        self._views = []
+        # a crash mid-append can leave some columns one row longer
+        self.rows = min(self._file_rows(n) for n in self.types)
+
+    def _file_rows(self, name):
+        size = os.path.getsize(os.path.join(self.store, name + ".col"))
+        return size // array(self.types[name]).itemsize
+
+    def __getitem__(self, name):
+        path = os.path.join(self.store, name + ".col")
+        code = self.types[name]
+        if self.rows == 0:
+            return np.zeros(0, dtype=code) if np is not None else array(code)
+        if np is not None:
+            return np.memmap(path, dtype=np.dtype(code), mode="r", shape=(self.rows,))
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mm)
+        itemsize = array(code).itemsize
+        base = memoryview(mm)
+        view = base[:self.rows * itemsize].cast(code)
+        self._views += [base, view]
+        return view
+
+    def close(self):
+        # views must go before the maps they point into
+        for v in reversed(self._views):
+            v.release()
+        for mm in self._maps:
+            mm.close()
+        self._views, self._maps = [], []
+
+##########################################################
+# B) Grouped aggregates
+##########################################################
+
+def group_mean(keys, values, mask=None):
+    """
+    {key: (count, mean of values)} for non-negative integer keys.
+    'mask' keeps only rows where it is true. Array-likes on the numpy
+    path; any iterables on the fallback path.
+    """
+    if np is not None:
+        keys = np.asarray(keys, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if mask is not None:
+            keys, values = keys[mask], values[mask]
+        if keys.size == 0:
+            return {}
+        counts = np.bincount(keys)
+        sums = np.bincount(keys, weights=values)
+        return {int(k): (int(counts[k]), float(sums[k] / counts[k]))
+                for k in np.nonzero(counts)[0]}
+    counts, sums = {}, {}
+    rows = zip(keys, values) if mask is None else (
+        (k, v) for k, v, m in zip(keys, values, mask) if m)
+    for k, v in rows:
+        counts[k] = counts.get(k, 0) + 1
+        sums[k] = sums.get(k, 0.0) + v
+    return {k: (counts[k], sums[k] / counts[k]) for k in counts}
+
+def _eq(col, value):
+    """col == value, vectorised when possible."""
+    if np is not None:
+        return np.asarray(col) == value
+    return (v == value for v in col)
+
+def _gt(col, value):
+    if np is not None:
+        return np.asarray(col) > value
+    return (v > value for v in col)
+
+def key_label(field, key):
+    if field == "picks":
+        return picks_label(key)
+    if field == "outcome":
+        return OUTCOMES[key]
+    if field == "sibling":
+        return SIBLINGS[key]
+    return str(key)
+
+##########################################################
+# C) Queries
+##########################################################
+
+def query_summary(cols):
+    out = [f"Sessions: {cols.rows}"]
+    if cols.rows == 0:
+        return out
+    ones = [1] * cols.rows if np is None else np.ones(cols.rows)
+    dist = group_mean(cols["outcome"], ones)
+    for k, (n, _) in sorted(dist.items()):
+        out.append(f"  {OUTCOMES[k]:<22} {n:>10}  {n / cols.rows:7.2%}")
+    talked = group_mean(cols["talked"], cols["synergy"])
+    if 1 in talked:
+        out.append(f"Mean synergy when talking: {talked[1][1]:.2f} ({talked[1][0]} sessions)")
+    return out
+
+def query_unlock_rate(cols, by):
+    unlocked = _eq(cols["outcome"], OUTCOMES.index("NTR Option Unlocked!"))
+    groups = group_mean(cols[by], unlocked)
+    out = [f"{by:<28} {'sessions':>10} {'unlock rate':>12}"]
+    for k, (n, rate) in sorted(groups.items(), key=lambda kv: -kv[1][1]):
+        out.append(f"{key_label(by, k):<28} {n:>10} {rate:12.2%}")
+    return out
+
+def query_mean_synergy(cols, by):
+    if by == "option":
+        out = [f"{'interaction':<12} {'option':>6} {'picked':>10} {'mean synergy':>13}"]
+        for i in range(1, N_INTERACTIONS + 1):
+            opt = cols[f"opt{i}"]
+            groups = group_mean(opt, cols[f"syn{i}"], _gt(opt, 0))
+            for k, (n, mean) in sorted(groups.items()):
+                out.append(f"{i:<12} {k:>6} {n:>10} {mean:13.2f}")
+        return out
+    groups = group_mean(cols[by], cols["synergy"], _eq(cols["talked"], 1))
+    out = [f"{by:<28} {'sessions':>10} {'mean synergy':>13}"]
+    for k, (n, mean) in sorted(groups.items(), key=lambda kv: -kv[1][1]):
+        out.append(f"{key_label(by, k):<28} {n:>10} {mean:13.2f}")
+    return out
+
+def query_rescore(cols, formula_path):
+    """
+    What-if: re-scores every stored session with designer formulas
+    (vectorised), per option: sessions that picked it, stored mean,
+    rescored mean for those, and rescored mean had everyone picked it.
+    """
+    import gameNTR
+    compiled = gameNTR.load_synergy_formulas(formula_path)
+    stat_cols = {a: cols[prefix + a] for prefix, abbrs in
+                 (("mc_", MC_ABBRS), ("rv_", RIVAL_ABBRS), ("tg_", TARGET_ABBRS))
+                 for a in abbrs}
+    out = [f"{'option':<8} {'picked':>10} {'stored':>8} {'rescored':>9} {'all rows':>9}"]
+    for (i, k), formula in sorted(compiled.items()):
+        values = formula.columns(stat_cols)
+        ones = [1] * cols.rows if np is None else np.ones(cols.rows)
+        everyone = group_mean(ones, values)
+        opt = cols[f"opt{i + 1}"]
+        stored = group_mean(opt, cols[f"syn{i + 1}"], _eq(opt, k)).get(k, (0, float("nan")))
+        new = group_mean(opt, values, _eq(opt, k)).get(k, (0, float("nan")))
+        out.append(f"{i + 1}.{k:<6} {stored[0]:>10} {stored[1]:8.2f} {new[1]:9.2f} "
+                   f"{everyone.get(1, (0, float('nan')))[1]:9.2f}")
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Query accumulated session results.")
+    ap.add_argument("--store", default=STORE_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("summary", help="session count, outcome mix, mean synergy")
+    ur = sub.add_parser("unlock-rate", help="share of 'NTR Option Unlocked!' per group")
+    ur.add_argument("--by", default="picks", help="integer field, e.g. picks, sibling, mc_SPT")
+    ms = sub.add_parser("mean-synergy", help="mean synergy per group")
+    ms.add_argument("--by", default="option", help="'option' or an integer field")
+    rs = sub.add_parser("rescore", help="re-score stored sessions with designer formulas")
+    rs.add_argument("formulas", help="formula file, see formulas.py")
+    args = ap.parse_args(argv)
+
+    if not os.path.exists(os.path.join(args.store, "schema.json")):
+        print(f"No results stored in '{args.store}' yet.")
+        return 1
+    started = time.perf_counter()
+    cols = Columns(args.store)
+    # 'option' is a mean-synergy grouping only; unlock-rate needs a real field
+    if args.cmd == "unlock-rate" or (args.cmd == "mean-synergy" and args.by != "option"):
+        if args.by not in cols.types or cols.types[args.by] in "fd":
+            ap.error(f"--by must be an integer field, got '{args.by}'")
+    if args.cmd == "summary":
+        out = query_summary(cols)
+    elif args.cmd == "unlock-rate":
+        out = query_unlock_rate(cols, args.by)
+    elif args.cmd == "rescore":
+        import formulas
+        try:
+            out = query_rescore(cols, args.formulas)
+        except formulas.FormulaError as e:
+            print(f"Formula file rejected: {e}")
+            return 1
+    else:
+        out = query_mean_synergy(cols, args.by)
+    print("\n".join(out))
+    print(f"\n({cols.rows} rows in {time.perf_counter() - started:.3f}s, "
+          f"{'numpy' if np is not None else 'pure Python'})")
+    cols.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())